@@ -22,7 +22,9 @@ import numpy as np
 from dygraph_to_static_utils import (
     Dy2StTestBase,
     enable_to_static_guard,
+    test_ast_only,
     test_legacy_and_pir,
+    test_legacy_only,
 )
 from predictor_utils import PredictorTools
 
@@ -30,8 +32,11 @@ import paddle
 from paddle import base
 from paddle.base.framework import unique_name
 from paddle.base.param_attr import ParamAttr
+from paddle.jit.api import ENV_ENABLE_SOT
+from paddle.jit.sot.utils.envs import ENV_MIN_GRAPH_SIZE
 from paddle.jit.translated_layer import INFER_MODEL_SUFFIX, INFER_PARAMS_SUFFIX
-from paddle.nn import BatchNorm, Linear
+from paddle.nn import BatchNorm2D, Linear
+from paddle.static.quantization import PostTrainingQuantization
 
 # Note: Set True to eliminate randomness.
 #     1. For one operation, cuDNN has several algorithms,
@@ -41,6 +46,10 @@ if base.is_compiled_with_cuda():
 
 SEED = 2020
 
+# NHWC lets cuDNN select tensor-core kernels for both pointwise and depthwise
+# convolutions, so only switch the layout when running on GPU.
+DATA_FORMAT = "NHWC" if base.is_compiled_with_cuda() else "NCHW"
+
 
 class ConvBNLayer(paddle.nn.Layer):
     def __init__(
@@ -55,8 +64,10 @@ class ConvBNLayer(paddle.nn.Layer):
         act='relu',
         use_cudnn=True,
         name=None,
+        data_format="NCHW",
     ):
         super().__init__()
+        full_name = self.full_name()
 
         self._conv = paddle.nn.Conv2D(
             in_channels=num_channels,
@@ -67,23 +78,45 @@ class ConvBNLayer(paddle.nn.Layer):
             groups=num_groups,
             weight_attr=ParamAttr(
                 initializer=paddle.nn.initializer.KaimingUniform(),
-                name=self.full_name() + "_weights",
+                name=full_name + "_weights",
             ),
             bias_attr=False,
+            data_format=data_format,
         )
 
-        self._batch_norm = BatchNorm(
+        # The moving mean and variance are named `name + "_mean"` and
+        # `name + "_variance"` by BatchNorm2D.
+        self._batch_norm = BatchNorm2D(
             num_filters,
-            act=act,
-            param_attr=ParamAttr(name=self.full_name() + "_bn" + "_scale"),
-            bias_attr=ParamAttr(name=self.full_name() + "_bn" + "_offset"),
-            moving_mean_name=self.full_name() + "_bn" + '_mean',
-            moving_variance_name=self.full_name() + "_bn" + '_variance',
+            weight_attr=ParamAttr(name=full_name + "_bn" + "_scale"),
+            bias_attr=ParamAttr(name=full_name + "_bn" + "_offset"),
+            data_format=data_format,
+            name=full_name + "_bn",
+        )
+        self._act = paddle.nn.ReLU() if act == 'relu' else None
+
+    @paddle.no_grad()
+    def fuse_bn_(self):
+        """
+        Fold the frozen BatchNorm statistics into the conv weight and bias,
+        only used for inference.
+        """
+        assert not self.training, "fuse_bn_ can only be called in eval mode."
+        bn = self._batch_norm
+        scale = bn.weight / paddle.sqrt(bn._variance + bn._epsilon)
+        self._conv.weight.set_value(
+            self._conv.weight * scale.reshape([-1, 1, 1, 1])
         )
+        self._conv.bias = self._conv.create_parameter(
+            shape=scale.shape, is_bias=True
+        )
+        self._conv.bias.set_value(bn.bias - bn._mean * scale)
+        self._batch_norm = paddle.nn.Identity()
 
     def forward(self, inputs, if_act=False):
-        y = self._conv(inputs)
-        y = self._batch_norm(y)
+        y = self._batch_norm(self._conv(inputs))
+        if self._act is not None:
+            y = self._act(y)
         if if_act:
             y = paddle.nn.functional.relu6(y)
         return y
@@ -99,25 +132,31 @@ class DepthwiseSeparable(paddle.nn.Layer):
         stride,
         scale,
         name=None,
+        data_format="NCHW",
     ):
         super().__init__()
+        num_filters1 = int(num_filters1 * scale)
+        num_filters2 = int(num_filters2 * scale)
+        num_groups = int(num_groups * scale)
 
         self._depthwise_conv = ConvBNLayer(
             num_channels=num_channels,
-            num_filters=int(num_filters1 * scale),
+            num_filters=num_filters1,
             filter_size=3,
             stride=stride,
             padding=1,
-            num_groups=int(num_groups * scale),
+            num_groups=num_groups,
             use_cudnn=True,
+            data_format=data_format,
         )
 
         self._pointwise_conv = ConvBNLayer(
-            num_channels=int(num_filters1 * scale),
+            num_channels=num_filters1,
             filter_size=1,
-            num_filters=int(num_filters2 * scale),
+            num_filters=num_filters2,
             stride=1,
             padding=0,
+            data_format=data_format,
         )
 
     def forward(self, inputs):
@@ -127,9 +166,10 @@ class DepthwiseSeparable(paddle.nn.Layer):
 
 
 class MobileNetV1(paddle.nn.Layer):
-    def __init__(self, scale=1.0, class_dim=1000):
+    def __init__(self, scale=1.0, class_dim=1000, data_format=DATA_FORMAT):
         super().__init__()
         self.scale = scale
+        self.data_format = data_format
         self.dwsl = []
 
         self.conv1 = ConvBNLayer(
@@ -139,127 +179,119 @@ class MobileNetV1(paddle.nn.Layer):
             num_filters=int(32 * scale),
             stride=2,
             padding=1,
+            data_format=data_format,
         )
 
-        dws21 = self.add_sublayer(
-            sublayer=DepthwiseSeparable(
-                num_channels=int(32 * scale),
-                num_filters1=32,
-                num_filters2=64,
-                num_groups=32,
-                stride=1,
-                scale=scale,
-            ),
-            name="conv2_1",
+        dws21 = DepthwiseSeparable(
+            num_channels=int(32 * scale),
+            num_filters1=32,
+            num_filters2=64,
+            num_groups=32,
+            stride=1,
+            scale=scale,
+            data_format=data_format,
         )
-        self.dwsl.append(dws21)
+        self.dwsl.append(("conv2_1", dws21))
 
-        dws22 = self.add_sublayer(
-            sublayer=DepthwiseSeparable(
-                num_channels=int(64 * scale),
-                num_filters1=64,
-                num_filters2=128,
-                num_groups=64,
-                stride=2,
-                scale=scale,
-            ),
-            name="conv2_2",
+        dws22 = DepthwiseSeparable(
+            num_channels=int(64 * scale),
+            num_filters1=64,
+            num_filters2=128,
+            num_groups=64,
+            stride=2,
+            scale=scale,
+            data_format=data_format,
         )
-        self.dwsl.append(dws22)
+        self.dwsl.append(("conv2_2", dws22))
 
-        dws31 = self.add_sublayer(
-            sublayer=DepthwiseSeparable(
-                num_channels=int(128 * scale),
-                num_filters1=128,
-                num_filters2=128,
-                num_groups=128,
-                stride=1,
-                scale=scale,
-            ),
-            name="conv3_1",
+        dws31 = DepthwiseSeparable(
+            num_channels=int(128 * scale),
+            num_filters1=128,
+            num_filters2=128,
+            num_groups=128,
+            stride=1,
+            scale=scale,
+            data_format=data_format,
         )
-        self.dwsl.append(dws31)
+        self.dwsl.append(("conv3_1", dws31))
 
-        dws32 = self.add_sublayer(
-            sublayer=DepthwiseSeparable(
-                num_channels=int(128 * scale),
-                num_filters1=128,
-                num_filters2=256,
-                num_groups=128,
-                stride=2,
-                scale=scale,
-            ),
-            name="conv3_2",
+        dws32 = DepthwiseSeparable(
+            num_channels=int(128 * scale),
+            num_filters1=128,
+            num_filters2=256,
+            num_groups=128,
+            stride=2,
+            scale=scale,
+            data_format=data_format,
         )
-        self.dwsl.append(dws32)
+        self.dwsl.append(("conv3_2", dws32))
 
-        dws41 = self.add_sublayer(
-            sublayer=DepthwiseSeparable(
-                num_channels=int(256 * scale),
-                num_filters1=256,
-                num_filters2=256,
-                num_groups=256,
-                stride=1,
-                scale=scale,
-            ),
-            name="conv4_1",
+        dws41 = DepthwiseSeparable(
+            num_channels=int(256 * scale),
+            num_filters1=256,
+            num_filters2=256,
+            num_groups=256,
+            stride=1,
+            scale=scale,
+            data_format=data_format,
         )
-        self.dwsl.append(dws41)
+        self.dwsl.append(("conv4_1", dws41))
 
-        dws42 = self.add_sublayer(
-            sublayer=DepthwiseSeparable(
-                num_channels=int(256 * scale),
-                num_filters1=256,
-                num_filters2=512,
-                num_groups=256,
-                stride=2,
-                scale=scale,
-            ),
-            name="conv4_2",
+        dws42 = DepthwiseSeparable(
+            num_channels=int(256 * scale),
+            num_filters1=256,
+            num_filters2=512,
+            num_groups=256,
+            stride=2,
+            scale=scale,
+            data_format=data_format,
         )
-        self.dwsl.append(dws42)
+        self.dwsl.append(("conv4_2", dws42))
 
+        num_channels_5 = int(512 * scale)
         for i in range(5):
-            tmp = self.add_sublayer(
-                sublayer=DepthwiseSeparable(
-                    num_channels=int(512 * scale),
-                    num_filters1=512,
-                    num_filters2=512,
-                    num_groups=512,
-                    stride=1,
-                    scale=scale,
-                ),
-                name="conv5_" + str(i + 1),
-            )
-            self.dwsl.append(tmp)
-
-        dws56 = self.add_sublayer(
-            sublayer=DepthwiseSeparable(
-                num_channels=int(512 * scale),
+            tmp = DepthwiseSeparable(
+                num_channels=num_channels_5,
                 num_filters1=512,
-                num_filters2=1024,
+                num_filters2=512,
                 num_groups=512,
-                stride=2,
+                stride=1,
                 scale=scale,
-            ),
-            name="conv5_6",
+                data_format=data_format,
+            )
+            self.dwsl.append(("conv5_" + str(i + 1), tmp))
+
+        dws56 = DepthwiseSeparable(
+            num_channels=num_channels_5,
+            num_filters1=512,
+            num_filters2=1024,
+            num_groups=512,
+            stride=2,
+            scale=scale,
+            data_format=data_format,
         )
-        self.dwsl.append(dws56)
+        self.dwsl.append(("conv5_6", dws56))
 
-        dws6 = self.add_sublayer(
-            sublayer=DepthwiseSeparable(
-                num_channels=int(1024 * scale),
-                num_filters1=1024,
-                num_filters2=1024,
-                num_groups=1024,
-                stride=1,
-                scale=scale,
-            ),
-            name="conv6",
+        dws6 = DepthwiseSeparable(
+            num_channels=int(1024 * scale),
+            num_filters1=1024,
+            num_filters2=1024,
+            num_groups=1024,
+            stride=1,
+            scale=scale,
+            data_format=data_format,
         )
-        self.dwsl.append(dws6)
+        self.dwsl.append(("conv6", dws6))
 
-        self.pool2d_avg = paddle.nn.AdaptiveAvgPool2D(1)
+        # The blocks are only registered through the Sequential, so their
+        # structured state dict keys change from `conv2_1.*` to
+        # `dwsl.conv2_1.*`. The parameter names come from ParamAttr and are
+        # not affected.
+        self.dwsl = paddle.nn.Sequential(*self.dwsl)
+
+        self.pool2d_avg = paddle.nn.AdaptiveAvgPool2D(
+            1, data_format=data_format
+        )
 
         self.out = Linear(
             int(1024 * scale),
@@ -272,11 +304,12 @@ class MobileNetV1(paddle.nn.Layer):
         )
 
     def forward(self, inputs):
+        if self.data_format == "NHWC":
+            inputs = paddle.transpose(inputs, [0, 2, 3, 1])
         y = self.conv1(inputs)
-        for dws in self.dwsl:
-            y = dws(y)
+        y = self.dwsl(y)
         y = self.pool2d_avg(y)
-        y = paddle.reshape(y, shape=[-1, 1024])
+        y = paddle.flatten(y, start_axis=1)
         y = self.out(y)
         return y
 
@@ -291,6 +324,7 @@ class InvertedResidualUnit(paddle.nn.Layer):
         filter_size,
         padding,
         expansion_factor,
+        data_format="NCHW",
     ):
         super().__init__()
         num_expfilter = int(round(num_in_filter * expansion_factor))
@@ -302,6 +336,7 @@ class InvertedResidualUnit(paddle.nn.Layer):
             padding=0,
             act=None,
             num_groups=1,
+            data_format=data_format,
         )
 
         self._bottleneck_conv = ConvBNLayer(
@@ -313,6 +348,7 @@ class InvertedResidualUnit(paddle.nn.Layer):
             num_groups=num_expfilter,
             act=None,
             use_cudnn=True,
+            data_format=data_format,
         )
 
         self._linear_conv = ConvBNLayer(
@@ -323,6 +359,7 @@ class InvertedResidualUnit(paddle.nn.Layer):
             padding=0,
             act=None,
             num_groups=1,
+            data_format=data_format,
         )
 
     def forward(self, inputs, ifshortcut):
@@ -335,7 +372,7 @@ class InvertedResidualUnit(paddle.nn.Layer):
 
 
 class InvresiBlocks(paddle.nn.Layer):
-    def __init__(self, in_c, t, c, n, s):
+    def __init__(self, in_c, t, c, n, s, data_format="NCHW"):
         super().__init__()
 
         self._first_block = InvertedResidualUnit(
@@ -346,8 +383,10 @@ class InvresiBlocks(paddle.nn.Layer):
             filter_size=3,
             padding=1,
             expansion_factor=t,
+            data_format=data_format,
         )
 
+        full_name = self.full_name()
         self._inv_blocks = []
         for i in range(1, n):
             tmp = self.add_sublayer(
@@ -359,8 +398,9 @@ class InvresiBlocks(paddle.nn.Layer):
                     filter_size=3,
                     padding=1,
                     expansion_factor=t,
+                    data_format=data_format,
                 ),
-                name=self.full_name() + "_" + str(i + 1),
+                name=full_name + "_" + str(i + 1),
             )
             self._inv_blocks.append(tmp)
 
@@ -372,10 +412,11 @@ class InvresiBlocks(paddle.nn.Layer):
 
 
 class MobileNetV2(paddle.nn.Layer):
-    def __init__(self, class_dim=1000, scale=1.0):
+    def __init__(self, class_dim=1000, scale=1.0, data_format=DATA_FORMAT):
         super().__init__()
         self.scale = scale
         self.class_dim = class_dim
+        self.data_format = data_format
 
         bottleneck_params_list = [
             (1, 16, 1, 1),
@@ -395,6 +436,7 @@ class MobileNetV2(paddle.nn.Layer):
             stride=2,
             act=None,
             padding=1,
+            data_format=data_format,
         )
 
         # 2. bottleneck sequences
@@ -404,14 +446,19 @@ class MobileNetV2(paddle.nn.Layer):
         for layer_setting in bottleneck_params_list:
             t, c, n, s = layer_setting
             i += 1
-            tmp = self.add_sublayer(
-                sublayer=InvresiBlocks(
-                    in_c=in_c, t=t, c=int(c * scale), n=n, s=s
-                ),
-                name='conv' + str(i),
+            tmp = InvresiBlocks(
+                in_c=in_c,
+                t=t,
+                c=int(c * scale),
+                n=n,
+                s=s,
+                data_format=data_format,
             )
-            self._invl.append(tmp)
+            self._invl.append(('conv' + str(i), tmp))
             in_c = int(c * scale)
+        # As in MobileNetV1, the structured state dict keys change from
+        # `conv2.*` to `_invl.conv2.*`, the parameter names do not.
+        self._invl = paddle.nn.Sequential(*self._invl)
 
         # 3. last_conv
         self._out_c = int(1280 * scale) if scale > 1.0 else 1280
@@ -422,10 +469,13 @@ class MobileNetV2(paddle.nn.Layer):
             stride=1,
             act=None,
             padding=0,
+            data_format=data_format,
         )
 
         # 4. pool
-        self._pool2d_avg = paddle.nn.AdaptiveAvgPool2D(1)
+        self._pool2d_avg = paddle.nn.AdaptiveAvgPool2D(
+            1, data_format=data_format
+        )
 
         # 5. fc
         tmp_param = ParamAttr(name=self.full_name() + "fc10_weights")
@@ -437,12 +487,13 @@ class MobileNetV2(paddle.nn.Layer):
         )
 
     def forward(self, inputs):
+        if self.data_format == "NHWC":
+            inputs = paddle.transpose(inputs, [0, 2, 3, 1])
         y = self._conv1(inputs, if_act=True)
-        for inv in self._invl:
-            y = inv(y)
+        y = self._invl(y)
         y = self._conv9(y, if_act=True)
         y = self._pool2d_avg(y)
-        y = paddle.reshape(y, shape=[-1, self._out_c])
+        y = paddle.flatten(y, start_axis=1)
         y = self._fc(y)
         return y
 
@@ -463,22 +514,17 @@ class FakeDataSet(paddle.io.Dataset):
         self.local_random = np.random.RandomState(SEED)
         self.label_size = label_size
 
-        self.imgs = []
-        self.labels = []
-
         self._generate_fake_data(batch_size * (train_steps + 1))
 
     def _generate_fake_data(self, length):
-        for i in range(length):
-            img = self.local_random.random_sample([3, 224, 224]).astype(
-                'float32'
-            )
-            label = self.local_random.randint(0, self.label_size, [1]).astype(
-                'int64'
-            )
-
-            self.imgs.append(img)
-            self.labels.append(label)
+        # Generate all samples in one contiguous array so that __getitem__
+        # only returns views instead of keeping a list of small arrays.
+        self.imgs = self.local_random.random_sample(
+            [length, 3, 224, 224]
+        ).astype('float32', copy=False)
+        self.labels = self.local_random.randint(
+            0, self.label_size, [length, 1]
+        ).astype('int64', copy=False)
 
     def __getitem__(self, idx):
         return [self.imgs[idx], self.labels[idx]]
@@ -486,6 +532,32 @@ class FakeDataSet(paddle.io.Dataset):
     def __len__(self):
         return len(self.imgs)
 
+    def device_batch_reader(self, batch_size, place):
+        """
+        Upload all samples to `place` once and return a reader that yields
+        batches sliced from the device tensors.
+        """
+        imgs = paddle.to_tensor(self.imgs, place=place)
+        labels = paddle.to_tensor(self.labels, place=place)
+
+        def reader():
+            for start in range(0, len(self) - batch_size + 1, batch_size):
+                end = start + batch_size
+                yield imgs[start:end], labels[start:end]
+
+        return reader
+
+
+class CalibrationDataSet(paddle.io.Dataset):
+    def __init__(self, dataset):
+        self.dataset = dataset
+
+    def __getitem__(self, idx):
+        return (self.dataset.imgs[idx],)
+
+    def __len__(self):
+        return len(self.dataset)
+
 
 class Args:
     batch_size = 4
@@ -497,6 +569,9 @@ class Args:
     class_dim = 50
     print_step = 1
     train_step = 10
+    use_amp = False
+    use_cinn = paddle.is_compiled_with_cinn()
+    use_int8 = False
     place = (
         paddle.CUDAPlace(0)
         if paddle.is_compiled_with_cuda()
@@ -509,92 +584,158 @@ class Args:
     dy_state_dict_save_path = None
 
 
-def train_mobilenet(args, to_static):
-    with unique_name.guard():
-        np.random.seed(SEED)
-        paddle.seed(SEED)
-        paddle.framework.random._manual_program_seed(SEED)
+def apply_to_static(net, use_cinn, input_spec=None):
+    build_strategy = paddle.static.BuildStrategy()
+    build_strategy.build_cinn_pass = use_cinn
+    return paddle.jit.to_static(
+        net, input_spec=input_spec, build_strategy=build_strategy
+    )
 
-        if args.model == "MobileNetV1":
-            net = paddle.jit.to_static(
-                MobileNetV1(class_dim=args.class_dim, scale=1.0)
+
+_TRACE_CACHE = {}
+
+
+def get_traced(model_name, class_dim, batch_size, use_cinn=False):
+    """
+    Build the to_static model only once for each model, to_static mode and
+    IR mode, later calls restore the initial parameters so every run starts
+    from the same weights.
+    """
+    # to_static picks AST or SOT when it wraps the model, so the SOT
+    # settings have to be part of the key.
+    key = (
+        model_name,
+        class_dim,
+        batch_size,
+        use_cinn,
+        ENV_ENABLE_SOT.get(),
+        ENV_MIN_GRAPH_SIZE.get(),
+        paddle.base.framework.use_pir_api(),
+    )
+    if key not in _TRACE_CACHE:
+        # A fixed batch size lets the traced program specialize on shapes.
+        input_spec = [
+            paddle.static.InputSpec([batch_size, 3, 224, 224], 'float32')
+        ]
+        if model_name == "MobileNetV1":
+            net = apply_to_static(
+                MobileNetV1(class_dim=class_dim, scale=1.0),
+                use_cinn,
+                input_spec=input_spec,
             )
-        elif args.model == "MobileNetV2":
-            net = paddle.jit.to_static(
-                MobileNetV2(class_dim=args.class_dim, scale=1.0)
+        elif model_name == "MobileNetV2":
+            net = apply_to_static(
+                MobileNetV2(class_dim=class_dim, scale=1.0),
+                use_cinn,
+                input_spec=input_spec,
             )
         else:
             print(
                 "wrong model name, please try model = MobileNetV1 or MobileNetV2"
             )
             sys.exit()
+        init_state = {
+            name: value.numpy() for name, value in net.state_dict().items()
+        }
+        _TRACE_CACHE[key] = (net, init_state)
+
+    net, init_state = _TRACE_CACHE[key]
+    net.set_state_dict(init_state)
+    return net
+
+
+def train_mobilenet(args, to_static):
+    with unique_name.guard():
+        np.random.seed(SEED)
+        paddle.seed(SEED)
+        paddle.framework.random._manual_program_seed(SEED)
 
+        net = get_traced(
+            args.model, args.class_dim, args.batch_size, args.use_cinn
+        )
         optimizer = create_optimizer(args=args, parameter_list=net.parameters())
+        scaler = paddle.amp.GradScaler(enable=args.use_amp)
 
         # 3. reader
         train_dataset = FakeDataSet(
             args.batch_size, args.class_dim, args.train_step
         )
-        BatchSampler = paddle.io.BatchSampler(
-            train_dataset, batch_size=args.batch_size
-        )
-        train_data_loader = paddle.io.DataLoader(
-            train_dataset, batch_sampler=BatchSampler
-        )
+        if isinstance(args.place, paddle.CUDAPlace) and args.num_epochs == 1:
+            # The whole fake dataset fits in GPU memory, so copy it only once.
+            train_data_loader = train_dataset.device_batch_reader(
+                args.batch_size, args.place
+            )
+        else:
+            BatchSampler = paddle.io.BatchSampler(
+                train_dataset, batch_size=args.batch_size
+            )
+            # Workers only help to overlap the host to device copies, which
+            # the CPU path does not have.
+            use_workers = isinstance(args.place, paddle.CUDAPlace)
+            train_data_loader = paddle.io.DataLoader(
+                train_dataset,
+                batch_sampler=BatchSampler,
+                num_workers=2 if use_workers else 0,
+                use_shared_memory=use_workers,
+                use_buffer_reader=True,
+            )
 
         # 4. train loop
         loss_data = []
         for eop in range(args.num_epochs):
             net.train()
             batch_id = 0
-            t_last = 0
+            t_last = time.time()
             for img, label in train_data_loader():
-                t1 = time.time()
-                t_start = time.time()
-                out = net(img)
-
-                t_end = time.time()
-                softmax_out = paddle.nn.functional.softmax(out)
-                loss = paddle.nn.functional.cross_entropy(
-                    input=softmax_out,
-                    label=label,
-                    reduction='none',
-                    use_softmax=False,
-                )
-                avg_loss = paddle.mean(x=loss)
-                acc_top1 = paddle.static.accuracy(input=out, label=label, k=1)
-                acc_top5 = paddle.static.accuracy(input=out, label=label, k=5)
-                t_start_back = time.time()
-
-                loss_data.append(avg_loss.numpy())
-                avg_loss.backward()
-                t_end_back = time.time()
-                optimizer.minimize(avg_loss)
+                with paddle.amp.auto_cast(
+                    enable=args.use_amp, level='O1', dtype='float16'
+                ):
+                    out = net(img)
+                    avg_loss = paddle.nn.functional.cross_entropy(
+                        input=out,
+                        label=label,
+                        reduction='mean',
+                        use_softmax=True,
+                    )
+
+                # Keep the loss on device, fetching it here would sync every step.
+                loss_data.append(avg_loss.detach())
+                scaled = scaler.scale(avg_loss)
+                scaled.backward()
+                scaler.minimize(optimizer, scaled)
                 net.clear_gradients()
 
-                t2 = time.time()
-                train_batch_elapse = t2 - t1
                 if batch_id % args.print_step == 0:
+                    acc_top1 = paddle.static.accuracy(
+                        input=out, label=label, k=1
+                    )
+                    acc_top5 = paddle.static.accuracy(
+                        input=out, label=label, k=5
+                    )
+                    # Kernels are launched asynchronously on GPU, wait for
+                    # them so that the elapsed time covers the whole steps.
+                    if isinstance(args.place, paddle.CUDAPlace):
+                        paddle.device.cuda.synchronize()
+                    t_now = time.time()
                     print(
-                        "epoch id: %d, batch step: %d,  avg_loss %0.5f acc_top1 %0.5f acc_top5 %0.5f %2.4f sec net_t:%2.4f back_t:%2.4f read_t:%2.4f"
+                        "epoch id: %d, batch step: %d,  avg_loss %0.5f acc_top1 %0.5f acc_top5 %0.5f %2.4f sec"
                         % (
                             eop,
                             batch_id,
                             avg_loss.numpy(),
                             acc_top1.numpy(),
                             acc_top5.numpy(),
-                            train_batch_elapse,
-                            t_end - t_start,
-                            t_end_back - t_start_back,
-                            t1 - t_last,
+                            t_now - t_last,
                         )
                     )
+                    t_last = t_now
                 batch_id += 1
-                t_last = time.time()
                 if batch_id > args.train_step:
                     # TODO(@xiongkun): open after save / load supported in pir.
                     if to_static and not paddle.base.framework.use_pir_api():
-                        paddle.jit.save(net, args.model_save_prefix)
+                        save_inference_model(args, net)
+                        if args.use_int8:
+                            quantize_model(args, train_dataset)
                     else:
                         paddle.save(
                             net.state_dict(),
@@ -602,10 +743,84 @@ def train_mobilenet(args, to_static):
                         )
                     break
 
-    return np.array(loss_data)
+    return np.stack([loss.numpy() for loss in loss_data])
+
+
+def save_inference_model(args, net):
+    """
+    Save the trained parameters through a separate to_static model, which is
+    traced with the single image input fed by the predict checks instead of
+    the training batch size.
+    """
+    if args.model == "MobileNetV1":
+        infer_net = MobileNetV1(class_dim=args.class_dim, scale=1.0)
+    elif args.model == "MobileNetV2":
+        infer_net = MobileNetV2(class_dim=args.class_dim, scale=1.0)
+    infer_net.set_state_dict(net.state_dict())
+    infer_net.eval()
+    infer_net = paddle.jit.to_static(
+        infer_net,
+        input_spec=[paddle.static.InputSpec([1, 3, 224, 224], 'float32')],
+        full_graph=True,
+    )
+    paddle.jit.save(infer_net, args.model_save_prefix)
 
 
-def predict_static(args, data):
+def quantize_model(args, dataset):
+    """
+    Apply post-training INT8 quantization to the saved inference model and
+    save the result into `args.model_save_dir + '_int8'`.
+    """
+    paddle.enable_static()
+    exe = base.Executor(args.place)
+    scope = paddle.static.Scope()
+    # save_quantized_model saves the parameters from the current scope, so
+    # the whole quantization has to run in the scope given to PTQ.
+    with paddle.static.scope_guard(scope):
+        _, feed_target_names, _ = paddle.static.io.load_inference_model(
+            args.model_save_dir,
+            executor=exe,
+            model_filename=args.model_filename,
+            params_filename=args.params_filename,
+        )
+        with paddle.static.program_guard(paddle.static.Program()):
+            image = paddle.static.data(
+                name=feed_target_names[0],
+                shape=[1, 3, 224, 224],
+                dtype='float32',
+            )
+        # The inference model takes one image at a time.
+        data_loader = paddle.io.DataLoader(
+            CalibrationDataSet(dataset),
+            places=args.place,
+            feed_list=[image],
+            return_list=False,
+            batch_size=1,
+            shuffle=False,
+        )
+        ptq = PostTrainingQuantization(
+            executor=exe,
+            scope=scope,
+            model_dir=args.model_save_dir,
+            model_filename=args.model_filename,
+            params_filename=args.params_filename,
+            data_loader=data_loader,
+            batch_size=1,
+            batch_nums=args.train_step,
+            algo='KL',
+            # Linear is lowered to matmul_v2.
+            quantizable_op_type=["conv2d", "depthwise_conv2d", "matmul_v2"],
+        )
+        ptq.quantize()
+        ptq.save_quantized_model(
+            args.model_save_dir + '_int8',
+            model_filename=args.model_filename,
+            params_filename=args.params_filename,
+        )
+    paddle.disable_static()
+
+
+def predict_static(args, data, model_dir=None):
     paddle.enable_static()
     exe = base.Executor(args.place)
     # load inference model
@@ -615,7 +830,7 @@ def predict_static(args, data):
         feed_target_names,
         fetch_targets,
     ] = paddle.static.io.load_inference_model(
-        args.model_save_dir,
+        model_dir or args.model_save_dir,
         executor=exe,
         model_filename=args.model_filename,
         params_filename=args.params_filename,
@@ -630,7 +845,8 @@ def predict_static(args, data):
     return pred_res[0]
 
 
-def predict_dygraph(args, data):
+@paddle.no_grad()
+def predict_dygraph(args, data, fuse_bn=False):
     with enable_to_static_guard(False):
         if args.model == "MobileNetV1":
             model = paddle.jit.to_static(
@@ -644,12 +860,17 @@ def predict_dygraph(args, data):
         model_dict = paddle.load(args.dy_state_dict_save_path + '.pdparams')
         model.set_dict(model_dict)
         model.eval()
+        if fuse_bn:
+            for layer in model.sublayers():
+                if isinstance(layer, ConvBNLayer):
+                    layer.fuse_bn_()
 
         pred_res = model(base.dygraph.to_variable(data))
 
         return pred_res.numpy()
 
 
+@paddle.no_grad()
 def predict_dygraph_jit(args, data):
     model = paddle.jit.load(args.model_save_prefix)
     model.eval()
@@ -698,7 +919,7 @@ class TestMobileNet(Dy2StTestBase):
         np.testing.assert_allclose(
             dy_out,
             st_out,
-            rtol=1e-05,
+            rtol=1e-03 if self.args.use_amp else 1e-05,
             err_msg=f'dy_out: {dy_out}, st_out: {st_out}',
         )
 
@@ -715,6 +936,7 @@ class TestMobileNet(Dy2StTestBase):
         local_random = np.random.RandomState(SEED)
         image = local_random.random_sample([1, 3, 224, 224]).astype('float32')
         dy_pre = predict_dygraph(self.args, image)
+        dy_fused_pre = predict_dygraph(self.args, image, fuse_bn=True)
         st_pre = predict_static(self.args, image)
         dy_jit_pre = predict_dygraph_jit(self.args, image)
         predictor_pre = predict_analysis_inference(self.args, image)
@@ -724,6 +946,15 @@ class TestMobileNet(Dy2StTestBase):
             rtol=1e-05,
             err_msg=f'dy_pre:\n {dy_pre}\n, st_pre: \n{st_pre}.',
         )
+        # Folding BatchNorm into the conv changes the rounding of every layer,
+        # small logits can move by more than rtol alone allows.
+        np.testing.assert_allclose(
+            dy_fused_pre,
+            dy_pre,
+            rtol=1e-03,
+            atol=1e-03,
+            err_msg=f'dy_fused_pre:\n {dy_fused_pre}\n, dy_pre: \n{dy_pre}.',
+        )
         np.testing.assert_allclose(
             dy_jit_pre,
             st_pre,
@@ -749,6 +980,52 @@ class TestMobileNet(Dy2StTestBase):
         if not paddle.base.framework.use_pir_api():
             self.verify_predict()
 
+    # float16 O1 convolutions are only supported on GPU, one to_static and
+    # IR mode is enough to check the AMP training path.
+    @unittest.skipUnless(
+        paddle.is_compiled_with_cuda(), "AMP training needs CUDA"
+    )
+    @test_ast_only
+    @test_legacy_only
+    def test_mobile_net_amp(self):
+        self.args.use_amp = True
+        self.assert_same_loss("MobileNetV1")
+
+    # The inference model is only saved with the legacy IR, and one
+    # to_static mode is enough to check the quantized model.
+    @test_ast_only
+    @test_legacy_only
+    def test_mobile_net_int8(self):
+        self.args.use_int8 = True
+        self.train("MobileNetV1", to_static=True)
+
+        int8_model_dir = self.args.model_save_dir + '_int8'
+        paddle.enable_static()
+        int8_program, _, _ = paddle.static.io.load_inference_model(
+            int8_model_dir,
+            executor=base.Executor(self.args.place),
+            model_filename=self.args.model_filename,
+            params_filename=self.args.params_filename,
+        )
+        paddle.disable_static()
+        quant_ops = [
+            op.type
+            for op in int8_program.global_block().ops
+            if "quantize" in op.type
+        ]
+        self.assertTrue(quant_ops, "PTQ did not quantize any op.")
+
+        local_random = np.random.RandomState(SEED)
+        image = local_random.random_sample([1, 3, 224, 224]).astype('float32')
+        st_pre = predict_static(self.args, image)
+        int8_pre = predict_static(self.args, image, model_dir=int8_model_dir)
+        np.testing.assert_allclose(
+            int8_pre,
+            st_pre,
+            atol=1e-02,
+            err_msg=f'int8_pre:\n {int8_pre}\n, st_pre: \n{st_pre}.',
+        )
+
     def verify_predict(self):
         # MobileNet-V1
         self.assert_same_predict("MobileNetV1")
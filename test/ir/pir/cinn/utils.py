@@ -42,18 +42,18 @@ def get_pir_program(static_fn):
 
 def get_jit_kernel_number(block):
     jit_kernel_number = 0
-    for op in block.ops:
-        op_name = op.name()
-        if JIT_KERNEL_NAME in op_name:
-            jit_kernel_number += 1
-        elif op_name == __IF_OP_NAME:
-            jit_kernel_number = (
-                jit_kernel_number
-                + get_jit_kernel_number(op.true_block())
-                + get_jit_kernel_number(op.false_block())
-            )
-        elif op_name == __WHILE_OP_NAME:
-            jit_kernel_number += get_jit_kernel_number(op.body())
+    # Walk nested blocks with an explicit stack instead of recursion.
+    blocks = [block]
+    while blocks:
+        for op in blocks.pop().ops:
+            op_name = op.name()
+            if JIT_KERNEL_NAME in op_name:
+                jit_kernel_number += 1
+            elif op_name == __IF_OP_NAME:
+                blocks.append(op.true_block())
+                blocks.append(op.false_block())
+            elif op_name == __WHILE_OP_NAME:
+                blocks.append(op.body())
 
     return jit_kernel_number
 
@@ -69,26 +69,31 @@ def check_jit_kernel_number(static_fn, expected_number):
 
 
 def get_jit_kernel_structure_helper(block, map_info):
-    if_op_idx, while_op_idx = 0, 0
-    for op in block.ops:
-        op_name = op.name()
-        if JIT_KERNEL_NAME in op_name:
-            map_info[JIT_KERNEL_NAME] += 1
-        elif op_name == __IF_OP_NAME:
-            true_key = f"if_{if_op_idx}"
-            map_info[true_key] = {}
-            get_jit_kernel_structure_helper(op.true_block(), map_info[true_key])
-
-            false_key = f"else_{if_op_idx}"
-            get_jit_kernel_structure_helper(
-                op.false_block(), map_info[false_key]
-            )
-            if_op_idx += 1
-        elif op.name() == __WHILE_OP_NAME:
-            key = f"while_{while_op_idx}"
-            map_info[key] = {}
-            get_jit_kernel_structure_helper(op.body(), map_info[key])
-            while_op_idx += 1
+    # Each pending entry pairs a block with the map its ops are recorded in,
+    # the if/while indices are local to a block so the visiting order of
+    # nested blocks does not change the keys.
+    pending = [(block, map_info)]
+    while pending:
+        cur_block, cur_map_info = pending.pop()
+        if_op_idx, while_op_idx = 0, 0
+        for op in cur_block.ops:
+            op_name = op.name()
+            if JIT_KERNEL_NAME in op_name:
+                cur_map_info[JIT_KERNEL_NAME] += 1
+            elif op_name == __IF_OP_NAME:
+                true_key = f"if_{if_op_idx}"
+                cur_map_info[true_key] = defaultdict(int)
+                pending.append((op.true_block(), cur_map_info[true_key]))
+
+                false_key = f"else_{if_op_idx}"
+                cur_map_info[false_key] = defaultdict(int)
+                pending.append((op.false_block(), cur_map_info[false_key]))
+                if_op_idx += 1
+            elif op_name == __WHILE_OP_NAME:
+                key = f"while_{while_op_idx}"
+                cur_map_info[key] = defaultdict(int)
+                pending.append((op.body(), cur_map_info[key]))
+                while_op_idx += 1
 
 
 def get_jit_kernel_structure(static_fn):
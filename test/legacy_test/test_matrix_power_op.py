@@ -12,6 +12,10 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import collections
+import concurrent.futures
+import functools
+import os
 import unittest
 
 import numpy as np
@@ -21,10 +25,95 @@ import paddle
 from paddle import base, static
 from paddle.base import core
 from paddle.pir_utils import test_with_pir_api
+from paddle.static import InputSpec
 
 paddle.enable_static()
 
 
+def _buffered_matrix_power(mat, n):
+    """
+    Compute the n-th power of (a batch of) square matrices by binary
+    exponentiation, writing every product into preallocated buffers.
+    """
+    if n < 0:
+        return _buffered_matrix_power(np.linalg.inv(mat), -n)
+
+    # Flatten all the batch dimensions so that every product is a single
+    # matmul over one contiguous stack of matrices.
+    shape = mat.shape
+    base = mat.reshape((-1,) + shape[-2:]).copy()
+    if n == 0:
+        base[...] = np.eye(shape[-1], dtype=mat.dtype)
+        return base.reshape(shape)
+
+    # The result starts from the first needed power of base, which avoids
+    # one product with the identity matrix.
+    result = None
+    buf = np.empty_like(base)
+    while True:
+        if n & 1:
+            if result is None:
+                result = base.copy()
+            else:
+                np.matmul(result, base, out=buf)
+                result, buf = buf, result
+        n >>= 1
+        if n == 0:
+            break
+        np.matmul(base, base, out=buf)
+        base, buf = buf, base
+    return result.reshape(shape)
+
+
+@functools.lru_cache(maxsize=None)
+def _base_mat(shape, dtype, seed):
+    # A generator per config keeps the cached inputs independent of the order
+    # in which the test cases run.
+    return np.random.default_rng(seed).random(shape, dtype=dtype)
+
+
+@functools.lru_cache(maxsize=None)
+def _ref_power(shape, dtype, seed, n):
+    """
+    Return the random input matrix and its n-th power, the input matrix is
+    shared by all the test cases with the same shape and dtype.
+    """
+    mat = _base_mat(shape, dtype, seed)
+    return mat, _buffered_matrix_power(mat, n)
+
+
+def _matrix_power_grad(x, n, grad_out):
+    """
+    Gradient of X ** n w.r.t. X, which is
+    sum_{k=0}^{n-1} (X ** k)^T @ grad_out @ (X ** (n - 1 - k))^T for n > 0,
+    negative n is chained with the gradient of the matrix inverse.
+    """
+    if n < 0:
+        inv = np.linalg.inv(x)
+        inv_t = np.swapaxes(inv, -1, -2)
+        return -inv_t @ _matrix_power_grad(inv, -n, grad_out) @ inv_t
+
+    powers_t = [np.broadcast_to(np.eye(x.shape[-1]), x.shape)]
+    x_t = np.swapaxes(x, -1, -2)
+    for _ in range(n - 1):
+        powers_t.append(x_t @ powers_t[-1])
+    grad = np.zeros_like(x)
+    for k in range(n):
+        grad += powers_t[k] @ grad_out @ powers_t[n - 1 - k]
+    return grad
+
+
+@functools.lru_cache(maxsize=None)
+def _ref_grad(shape, dtype, seed, n):
+    """
+    Return the gradient of mean(X ** n), the loss used by OpTest.check_grad,
+    computed in float64.
+    """
+    x = _base_mat(shape, dtype, seed).astype(np.float64)
+    grad_out = np.full(shape, 1.0 / x.size)
+    return _matrix_power_grad(x, n, grad_out).astype(dtype)
+
+
 class TestMatrixPowerOp(OpTest):
     def config(self):
         self.matrix_shape = [10, 10]
@@ -36,14 +125,20 @@ class TestMatrixPowerOp(OpTest):
         self.python_api = paddle.tensor.matrix_power
         self.config()
 
-        np.random.seed(123)
-        mat = np.random.random(self.matrix_shape).astype(self.dtype)
-        powered_mat = np.linalg.matrix_power(mat, self.n)
+        mat, powered_mat = _ref_power(
+            tuple(self.matrix_shape), self.dtype, 123, self.n
+        )
 
         self.inputs = {"X": mat}
+        # Not deferred to test_check_output, check_grad builds the op from
+        # self.outputs as well. The reference is cached per config, so the
+        # two tests compute it only once.
         self.outputs = {"Out": powered_mat}
         self.attrs = {"n": self.n}
 
+    def ref_grad(self):
+        return _ref_grad(tuple(self.matrix_shape), self.dtype, 123, self.n)
+
     def test_check_output(self):
         self.check_output(check_pir=True)
 
@@ -51,61 +146,12 @@ class TestMatrixPowerOp(OpTest):
         self.check_grad(
             ["X"],
             "Out",
-            numeric_grad_delta=1e-5,
             max_relative_error=1e-7,
+            user_defined_grads=[self.ref_grad()],
             check_pir=True,
         )
 
 
-class TestMatrixPowerOpN1(TestMatrixPowerOp):
-    def config(self):
-        self.matrix_shape = [10, 10]
-        self.dtype = "float64"
-        self.n = 1
-
-
-class TestMatrixPowerOpN2(TestMatrixPowerOp):
-    def config(self):
-        self.matrix_shape = [10, 10]
-        self.dtype = "float64"
-        self.n = 2
-
-
-class TestMatrixPowerOpN3(TestMatrixPowerOp):
-    def config(self):
-        self.matrix_shape = [10, 10]
-        self.dtype = "float64"
-        self.n = 3
-
-
-class TestMatrixPowerOpN4(TestMatrixPowerOp):
-    def config(self):
-        self.matrix_shape = [10, 10]
-        self.dtype = "float64"
-        self.n = 4
-
-
-class TestMatrixPowerOpN5(TestMatrixPowerOp):
-    def config(self):
-        self.matrix_shape = [10, 10]
-        self.dtype = "float64"
-        self.n = 5
-
-
-class TestMatrixPowerOpN6(TestMatrixPowerOp):
-    def config(self):
-        self.matrix_shape = [10, 10]
-        self.dtype = "float64"
-        self.n = 6
-
-
-class TestMatrixPowerOpN10(TestMatrixPowerOp):
-    def config(self):
-        self.matrix_shape = [10, 10]
-        self.dtype = "float64"
-        self.n = 10
-
-
 class TestMatrixPowerOpNMinus(TestMatrixPowerOp):
     def config(self):
         self.matrix_shape = [10, 10]
@@ -116,231 +162,232 @@ class TestMatrixPowerOpNMinus(TestMatrixPowerOp):
         self.check_grad(
             ["X"],
             "Out",
-            numeric_grad_delta=1e-5,
             max_relative_error=1e-6,
+            user_defined_grads=[self.ref_grad()],
             check_pir=True,
         )
 
 
-class TestMatrixPowerOpNMinus2(TestMatrixPowerOpNMinus):
-    def config(self):
-        self.matrix_shape = [10, 10]
-        self.dtype = "float64"
-        self.n = -2
-
-
-class TestMatrixPowerOpNMinus3(TestMatrixPowerOpNMinus):
-    def config(self):
-        self.matrix_shape = [10, 10]
-        self.dtype = "float64"
-        self.n = -3
-
-
-class TestMatrixPowerOpNMinus4(TestMatrixPowerOpNMinus):
-    def config(self):
-        self.matrix_shape = [10, 10]
-        self.dtype = "float64"
-        self.n = -4
-
-
-class TestMatrixPowerOpNMinus5(TestMatrixPowerOpNMinus):
-    def config(self):
-        self.matrix_shape = [10, 10]
-        self.dtype = "float64"
-        self.n = -5
-
-
-class TestMatrixPowerOpNMinus6(TestMatrixPowerOpNMinus):
+class TestMatrixPowerOpFP32(TestMatrixPowerOp):
     def config(self):
         self.matrix_shape = [10, 10]
-        self.dtype = "float64"
-        self.n = -6
-
+        self.dtype = "float32"
+        self.n = 2
 
-class TestMatrixPowerOpNMinus10(TestMatrixPowerOp):
-    def config(self):
-        self.matrix_shape = [10, 10]
-        self.dtype = "float64"
-        self.n = -10
+    def setUp(self):
+        super().setUp()
+        # The reference is computed in float32 as well, the relaxed
+        # tolerance of these cases does not need a float64 one.
+        self.assertEqual(self.outputs["Out"].dtype, np.float32)
 
     def test_grad(self):
         self.check_grad(
             ["X"],
             "Out",
-            numeric_grad_delta=1e-5,
-            max_relative_error=1e-6,
+            max_relative_error=1e-2,
+            user_defined_grads=[self.ref_grad()],
             check_pir=True,
         )
 
 
-class TestMatrixPowerOpBatched1(TestMatrixPowerOp):
-    def config(self):
-        self.matrix_shape = [8, 4, 4]
-        self.dtype = "float64"
-        self.n = 5
-
-
-class TestMatrixPowerOpBatched2(TestMatrixPowerOp):
-    def config(self):
-        self.matrix_shape = [2, 6, 4, 4]
-        self.dtype = "float64"
-        self.n = 4
-
-
-class TestMatrixPowerOpBatched3(TestMatrixPowerOp):
-    def config(self):
-        self.matrix_shape = [2, 6, 4, 4]
-        self.dtype = "float64"
-        self.n = 0
-
-
-class TestMatrixPowerOpBatchedLong(TestMatrixPowerOp):
-    def config(self):
-        self.matrix_shape = [1, 2, 3, 4, 4, 3, 3]
-        self.dtype = "float64"
-        self.n = 3
-
-
-class TestMatrixPowerOpLarge1(TestMatrixPowerOp):
-    def config(self):
-        self.matrix_shape = [32, 32]
-        self.dtype = "float64"
-        self.n = 3
-
-
-class TestMatrixPowerOpLarge2(TestMatrixPowerOp):
-    def config(self):
-        self.matrix_shape = [10, 10]
-        self.dtype = "float64"
-        self.n = 32
-
-
-class TestMatrixPowerOpFP32(TestMatrixPowerOp):
-    def config(self):
-        self.matrix_shape = [10, 10]
-        self.dtype = "float32"
-        self.n = 2
+# The slowest cases only run when PADDLE_RUN_SLOW=1, which CI sets.
+_FULL = os.environ.get("PADDLE_RUN_SLOW") == "1"
+_SLOW_CASES = {"BatchedLong"}
+
+
+def create_test_class(parent, suffix, matrix_shape, dtype, n):
+    class TestMatrixPowerOpCase(parent):
+        def config(self):
+            self.matrix_shape = matrix_shape
+            self.dtype = dtype
+            self.n = n
+
+    cls_name = "TestMatrixPowerOp" + suffix
+    TestMatrixPowerOpCase.__name__ = cls_name
+    TestMatrixPowerOpCase.__qualname__ = cls_name
+    if suffix in _SLOW_CASES:
+        TestMatrixPowerOpCase = unittest.skipUnless(
+            _FULL, "slow batched matrix_power test"
+        )(TestMatrixPowerOpCase)
+    globals()[cls_name] = TestMatrixPowerOpCase
+
+
+# (parent, suffix, matrix_shape, dtype, n), the parent decides how the
+# gradient is checked.
+CASES = [
+    (TestMatrixPowerOp, "N1", [10, 10], "float64", 1),
+    (TestMatrixPowerOp, "N2", [10, 10], "float64", 2),
+    (TestMatrixPowerOp, "N3", [10, 10], "float64", 3),
+    (TestMatrixPowerOp, "N4", [10, 10], "float64", 4),
+    (TestMatrixPowerOp, "N5", [10, 10], "float64", 5),
+    (TestMatrixPowerOp, "N6", [10, 10], "float64", 6),
+    (TestMatrixPowerOp, "N10", [10, 10], "float64", 10),
+    (TestMatrixPowerOpNMinus, "NMinus2", [10, 10], "float64", -2),
+    (TestMatrixPowerOpNMinus, "NMinus3", [10, 10], "float64", -3),
+    (TestMatrixPowerOpNMinus, "NMinus4", [10, 10], "float64", -4),
+    (TestMatrixPowerOpNMinus, "NMinus5", [10, 10], "float64", -5),
+    (TestMatrixPowerOpNMinus, "NMinus6", [10, 10], "float64", -6),
+    (TestMatrixPowerOpNMinus, "NMinus10", [10, 10], "float64", -10),
+    (TestMatrixPowerOp, "Batched1", [8, 4, 4], "float64", 5),
+    (TestMatrixPowerOp, "Batched2", [2, 6, 4, 4], "float64", 4),
+    (TestMatrixPowerOp, "Batched3", [2, 6, 4, 4], "float64", 0),
+    (TestMatrixPowerOp, "BatchedLong", [1, 2, 3, 4, 4, 3, 3], "float64", 3),
+    (TestMatrixPowerOp, "Large1", [32, 32], "float64", 3),
+    (TestMatrixPowerOp, "Large2", [10, 10], "float64", 32),
+    (TestMatrixPowerOpFP32, "BatchedFP32", [2, 8, 4, 4], "float32", 2),
+    (TestMatrixPowerOpFP32, "Large1FP32", [32, 32], "float32", 2),
+    (TestMatrixPowerOpFP32, "Large2FP32", [10, 10], "float32", 32),
+    (TestMatrixPowerOpFP32, "FP32Minus", [10, 10], "float32", -1),
+]
+
+for case in CASES:
+    create_test_class(*case)
+
+
+def _fast_allclose(actual, expected, rtol):
+    """
+    Same check as np.testing.assert_allclose, which is only run to report
+    the mismatch when the cheap np.allclose fails.
+    """
+    if actual.shape == expected.shape and np.allclose(
+        actual, expected, rtol=rtol, atol=0
+    ):
+        return
+    np.testing.assert_allclose(actual, expected, rtol=rtol)
+
+
+def _test_places():
+    places = [base.CPUPlace()]
+    if core.is_compiled_with_cuda():
+        places.append(base.CUDAPlace(0))
+    return places
+
+
+# Traced once and shared by the dygraph tests, which all call matrix_power
+# with the same signature.
+@paddle.jit.to_static(
+    input_spec=[InputSpec([4, 4], "float64")], full_graph=True
+)
+def _mp_neg2(x):
+    return paddle.linalg.matrix_power(x, -2)
 
-    def test_grad(self):
-        self.check_grad(["X"], "Out", max_relative_error=1e-2, check_pir=True)
-
-
-class TestMatrixPowerOpBatchedFP32(TestMatrixPowerOpFP32):
-    def config(self):
-        self.matrix_shape = [2, 8, 4, 4]
-        self.dtype = "float32"
-        self.n = 2
 
+class TestMatrixPowerAPI(unittest.TestCase):
+    # Every test starts a new generator from the class's own seed sequence,
+    # so its input does not depend on which tests ran before it.
+    _SEED_SEQ = np.random.SeedSequence(123, spawn_key=(0,))
 
-class TestMatrixPowerOpLarge1FP32(TestMatrixPowerOpFP32):
-    def config(self):
-        self.matrix_shape = [32, 32]
-        self.dtype = "float32"
-        self.n = 2
-
-
-class TestMatrixPowerOpLarge2FP32(TestMatrixPowerOpFP32):
-    def config(self):
-        self.matrix_shape = [10, 10]
-        self.dtype = "float32"
-        self.n = 32
-
-
-class TestMatrixPowerOpFP32Minus(TestMatrixPowerOpFP32):
-    def config(self):
-        self.matrix_shape = [10, 10]
-        self.dtype = "float32"
-        self.n = -1
-
+    @classmethod
+    def setUpClass(cls):
+        cls.places = _test_places()
+        # One executor per place, shared by all the tests of the class.
+        cls._executors = {place: base.Executor(place) for place in cls.places}
 
-class TestMatrixPowerAPI(unittest.TestCase):
     def setUp(self):
-        np.random.seed(123)
-        self.places = [base.CPUPlace()]
-        if core.is_compiled_with_cuda():
-            self.places.append(base.CUDAPlace(0))
+        self.rng = np.random.default_rng(self._SEED_SEQ)
+        self._input_np_4x4 = self.rng.random((4, 4))
+        self._ref_pow_m2 = np.linalg.matrix_power(self._input_np_4x4, -2)
 
-    def check_static_result(self, place):
-        with static.program_guard(static.Program(), static.Program()):
+    def build_static_program(self):
+        main_program = static.Program()
+        with static.program_guard(main_program, static.Program()):
             input_x = paddle.static.data(
                 name="input_x", shape=[4, 4], dtype="float64"
             )
             result = paddle.linalg.matrix_power(x=input_x, n=-2)
-            input_np = np.random.random([4, 4]).astype("float64")
-            result_np = np.linalg.matrix_power(input_np, -2)
-
-            exe = base.Executor(place)
-            fetches = exe.run(
-                feed={"input_x": input_np},
-                fetch_list=[result],
-            )
-            np.testing.assert_allclose(
-                fetches[0], np.linalg.matrix_power(input_np, -2), rtol=1e-05
-            )
+        return main_program, result
+
+    def check_static_result(self, place, main_program, result):
+        exe = self._executors[place]
+        fetches = exe.run(
+            main_program,
+            feed={"input_x": self._input_np_4x4},
+            fetch_list=[result],
+        )
+        _fast_allclose(fetches[0], self._ref_pow_m2, rtol=1e-05)
 
     @test_with_pir_api
     def test_static(self):
+        # The program is the same for all places, only build it once.
+        main_program, result = self.build_static_program()
         for place in self.places:
-            self.check_static_result(place=place)
+            self.check_static_result(place, main_program, result)
 
     def test_dygraph(self):
+        # Convert the input once on the host and only copy it to each place.
+        with base.dygraph.guard(base.CPUPlace()):
+            input_cpu = paddle.to_tensor(
+                self._input_np_4x4, place=base.CPUPlace()
+            )
         for place in self.places:
             with base.dygraph.guard(place):
-                input_np = np.random.random([4, 4]).astype("float64")
-                input = paddle.to_tensor(input_np)
-                result = paddle.linalg.matrix_power(input, -2)
-                np.testing.assert_allclose(
-                    result.numpy(),
-                    np.linalg.matrix_power(input_np, -2),
-                    rtol=1e-05,
-                )
+                input = input_cpu._copy_to(place, True)
+                result = _mp_neg2(input)
+                _fast_allclose(result.numpy(), self._ref_pow_m2, rtol=1e-05)
 
 
 class TestMatrixPowerAPIError(unittest.TestCase):
+    _SEED_SEQ = np.random.SeedSequence(123, spawn_key=(1,))
+
+    def setUp(self):
+        self.rng = np.random.default_rng(self._SEED_SEQ)
+
     @test_with_pir_api
     def test_errors(self):
-        input_np = np.random.random([4, 4]).astype("float64")
+        # The checks raise before anything is lowered, so each IR mode only
+        # needs a throwaway program to hold the inputs.
+        with static.program_guard(static.Program(), static.Program()):
+            input_np = self.rng.random([4, 4])
 
-        # input must be Variable.
-        self.assertRaises(TypeError, paddle.linalg.matrix_power, input_np)
+            # input must be Variable.
+            self.assertRaises(TypeError, paddle.linalg.matrix_power, input_np)
 
-        # n must be int
-        for n in [2.0, '2', -2.0]:
-            input = paddle.static.data(
+            # n must be int
+            input_float32 = paddle.static.data(
                 name="input_float32", shape=[4, 4], dtype='float32'
             )
-            self.assertRaises(TypeError, paddle.linalg.matrix_power, input, n)
+            for n in [2.0, '2', -2.0]:
+                self.assertRaises(
+                    TypeError, paddle.linalg.matrix_power, input_float32, n
+                )
 
-        # The data type of input must be float32 or float64.
-        for dtype in ["bool", "int32", "int64", "float16"]:
+            # The data type of input must be float32 or float64.
+            dtype_vars = {
+                dtype: paddle.static.data(
+                    name="input_" + dtype, shape=[4, 4], dtype=dtype
+                )
+                for dtype in ["bool", "int32", "int64", "float16"]
+            }
+            for input in dtype_vars.values():
+                self.assertRaises(
+                    TypeError, paddle.linalg.matrix_power, input, 2
+                )
+
+            # The number of dimensions of input must be >= 2.
             input = paddle.static.data(
-                name="input_" + dtype, shape=[4, 4], dtype=dtype
+                name="input_2", shape=[4], dtype="float32"
             )
-            self.assertRaises(TypeError, paddle.linalg.matrix_power, input, 2)
-
-        # The number of dimensions of input must be >= 2.
-        input = paddle.static.data(name="input_2", shape=[4], dtype="float32")
-        self.assertRaises(ValueError, paddle.linalg.matrix_power, input, 2)
+            self.assertRaises(ValueError, paddle.linalg.matrix_power, input, 2)
 
-        # The inner-most 2 dimensions of input should be equal to each other
-        input = paddle.static.data(
-            name="input_3", shape=[4, 5], dtype="float32"
-        )
-        self.assertRaises(ValueError, paddle.linalg.matrix_power, input, 2)
+            # The inner-most 2 dimensions of input should be equal to each other
+            input = paddle.static.data(
+                name="input_3", shape=[4, 5], dtype="float32"
+            )
+            self.assertRaises(ValueError, paddle.linalg.matrix_power, input, 2)
 
-        # The size of input should not be 0
-        input = paddle.static.data(
-            name="input_4", shape=[1, 1, 0, 0], dtype="float32"
-        )
-        self.assertRaises(ValueError, paddle.linalg.matrix_power, input, 2)
+            # The size of input should not be 0
+            input = paddle.static.data(
+                name="input_4", shape=[1, 1, 0, 0], dtype="float32"
+            )
+            self.assertRaises(ValueError, paddle.linalg.matrix_power, input, 2)
 
-        # The size of input should not be 0
-        input = paddle.static.data(
-            name="input_5", shape=[0, 0], dtype="float32"
-        )
-        self.assertRaises(
-            ValueError, paddle.linalg.matrix_power, input, -956301312
-        )
+            # The size of input should not be 0
+            input = paddle.static.data(
+                name="input_5", shape=[0, 0], dtype="float32"
+            )
+            self.assertRaises(
+                ValueError, paddle.linalg.matrix_power, input, -956301312
+            )
 
     def test_old_ir_errors(self):
         # When out is set, the data type must be the same as input.
@@ -352,49 +399,146 @@ class TestMatrixPowerAPIError(unittest.TestCase):
 
 
 class TestMatrixPowerSingularAPI(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Switch to static mode once for the class, the dygraph test
+        # enters its own guard.
+        cls._in_dynamic_mode = paddle.in_dynamic_mode()
+        paddle.enable_static()
+        cls.places = _test_places()
+        cls._executors = {place: base.Executor(place) for place in cls.places}
+
+    @classmethod
+    def tearDownClass(cls):
+        if cls._in_dynamic_mode:
+            paddle.disable_static()
+
     def setUp(self):
-        self.places = [base.CPUPlace()]
-        if core.is_compiled_with_cuda():
-            self.places.append(base.CUDAPlace(0))
+        # Any singular matrix will do, it is shared by all the tests.
+        self._input_np_4x4 = np.ones([4, 4]).astype("float64")
+        self.assertLess(np.linalg.matrix_rank(self._input_np_4x4), 4)
 
-    def check_static_result(self, place):
-        with static.program_guard(static.Program(), static.Program()):
+    def build_static_program(self):
+        main_program = static.Program()
+        with static.program_guard(main_program, static.Program()):
             input = paddle.static.data(
                 name="input", shape=[4, 4], dtype="float64"
             )
             result = paddle.linalg.matrix_power(x=input, n=-2)
+        return main_program, result
 
-            input_np = np.zeros([4, 4]).astype("float64")
-
-            exe = base.Executor(place)
-            try:
-                fetches = exe.run(
-                    feed={"input": input_np},
-                    fetch_list=[result],
-                )
-            except RuntimeError as ex:
-                print("The mat is singular")
-            except ValueError as ex:
-                print("The mat is singular")
+    def check_static_result(self, place, main_program, result):
+        exe = self._executors[place]
+        self.assertRaises(
+            (RuntimeError, ValueError),
+            exe.run,
+            main_program,
+            feed={"input": self._input_np_4x4},
+            fetch_list=[result],
+        )
 
     @test_with_pir_api
     def test_static(self):
-        paddle.enable_static()
+        self.assertFalse(paddle.in_dynamic_mode())
+        # The program is the same for all places, only build it once.
+        main_program, result = self.build_static_program()
         for place in self.places:
-            self.check_static_result(place=place)
-        paddle.disable_static()
+            self.check_static_result(place, main_program, result)
 
     def test_dygraph(self):
         for place in self.places:
             with base.dygraph.guard(place):
-                input_np = np.ones([4, 4]).astype("float64")
-                input = base.dygraph.to_variable(input_np)
-                try:
-                    result = paddle.linalg.matrix_power(input, -2)
-                except RuntimeError as ex:
-                    print("The mat is singular")
-                except ValueError as ex:
-                    print("The mat is singular")
+                input = base.dygraph.to_variable(self._input_np_4x4)
+                self.assertRaises((RuntimeError, ValueError), _mp_neg2, input)
+
+
+def _init_test_worker():
+    paddle.enable_static()
+
+
+def _run_test_bucket(test_ids):
+    """
+    Run the tests in a worker process and return the outcome of each test
+    as a picklable (status, detail) pair.
+    """
+    result = unittest.TestResult()
+    unittest.defaultTestLoader.loadTestsFromNames(test_ids).run(result)
+    outcomes = {test_id: ("success", "") for test_id in test_ids}
+    for test, detail in result.failures + result.errors:
+        outcomes[test.id()] = ("failure", detail)
+    for test, reason in result.skipped:
+        outcomes[test.id()] = ("skip", reason)
+    return outcomes
+
+
+class _RemoteTestCase(unittest.TestCase):
+    """
+    Report the outcome of a test which has been run in a worker process.
+    """
+
+    def __init__(self, test_id, status, detail):
+        super().__init__("_replay")
+        self._test_id = test_id
+        self._status = status
+        self._detail = detail
+
+    def id(self):
+        return self._test_id
+
+    def __str__(self):
+        return self._test_id
+
+    def _replay(self):
+        if self._status == "skip":
+            self.skipTest(self._detail)
+        if self._status == "failure":
+            self.fail(self._detail)
+
+
+class _ParallelSuite(unittest.TestSuite):
+    def __init__(self, buckets, num_workers):
+        super().__init__()
+        self._buckets = buckets
+        self._num_workers = num_workers
+
+    def run(self, result, debug=False):
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=self._num_workers, initializer=_init_test_worker
+        ) as pool:
+            for outcomes in pool.map(_run_test_bucket, self._buckets):
+                for test_id, (status, detail) in outcomes.items():
+                    _RemoteTestCase(test_id, status, detail).run(result)
+        return result
+
+
+def _iter_tests(suite):
+    for test in suite:
+        if isinstance(test, unittest.TestSuite):
+            yield from _iter_tests(test)
+        else:
+            yield test
+
+
+def _bucket_key(test):
+    if isinstance(test, TestMatrixPowerOp):
+        test.config()
+        return (test.dtype, len(test.matrix_shape))
+    return type(test).__name__
+
+
+def load_tests(loader, standard_tests, pattern):
+    """
+    The test classes share no state, set PADDLE_TEST_WORKERS to a number
+    larger than 1 to run them in that many worker processes.
+    """
+    num_workers = int(os.environ.get("PADDLE_TEST_WORKERS", "1"))
+    if num_workers <= 1:
+        return standard_tests
+
+    buckets = collections.defaultdict(list)
+    for test in _iter_tests(standard_tests):
+        buckets[_bucket_key(test)].append(test.id())
+    return _ParallelSuite(list(buckets.values()), num_workers)
 
 
 if __name__ == "__main__":